@@ -1,14 +1,18 @@
+import json
 import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime, date, time, timedelta
 import re
+from collections import Counter
+import numpy as np
 import pandas as pd
 import streamlit as st
-import yaml
 
 APP_TITLE = "Social Post Tracker — Lean"
 DB_PATH = Path("data/social_tracker.db")
-TAXO_PATH = Path("config/taxonomies.yml")
+TAXO_PATH = Path("config/taxonomies.json")
+LEGACY_TAXO_PATH = Path("config/taxonomies.yml")
 
 PLATFORMS = ["instagram","tiktok","facebook","youtube","pinterest","email"]
 
@@ -18,16 +22,49 @@ DEFAULT_TAXO = {
 }
 
 # ---------- setup ----------
+# Streamlit re-executes this script on every rerun, so per-process memoization has to live in st.cache_*
+@st.cache_resource(show_spinner=False)
 def ensure_dirs():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     TAXO_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+def _connect():
+    # autocommit, shared across sessions and reruns, so never close it
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.executescript("""
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+    PRAGMA mmap_size=268435456;
+    """)
+    return conn
+
+@st.cache_resource
 def get_conn():
+    # one write connection per process, reused across reruns
     ensure_dirs()
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL;")
+    conn = _connect()
+    conn.executescript("""
+    PRAGMA journal_mode=WAL;
+    PRAGMA wal_autocheckpoint=1000;
+    """)
+    return conn
+
+@st.cache_resource
+def get_read_conn():
+    # page queries get their own connection: under WAL it only sees committed rows, never the middle
+    # of another session's BEGIN IMMEDIATE on get_conn(), so reads don't need write_lock()
+    get_conn()  # creates the file and switches it to WAL first
+    conn = _connect()
+    conn.execute("PRAGMA query_only=ON")
     return conn
 
+@st.cache_resource
+def write_lock():
+    # every session shares get_conn(), so writers must not interleave BEGIN/COMMIT on it
+    return threading.Lock()
+
 def _table_info(conn):
     # returns list of dicts: name, notnull(0/1), dflt
     rows = conn.execute("PRAGMA table_info(posts)").fetchall()
@@ -36,9 +73,7 @@ def _table_info(conn):
 def _column_exists(conn, col):
     return any(c["name"] == col for c in _table_info(conn))
 
-def init_db():
-    conn = get_conn()
-    conn.executescript("""
+SCHEMA_SQL = """
     CREATE TABLE IF NOT EXISTS posts(
       id INTEGER PRIMARY KEY,
       platform TEXT NOT NULL,
@@ -52,43 +87,138 @@ def init_db():
       notes TEXT,
       created_at TEXT DEFAULT (datetime('now'))
     );
-    CREATE INDEX IF NOT EXISTS idx_posts_platform_date ON posts(platform, post_datetime);
-    CREATE INDEX IF NOT EXISTS idx_posts_campaign ON posts(campaign);
-    CREATE INDEX IF NOT EXISTS idx_posts_caption ON posts(caption_style);
-    """)
+    -- covers every column the date-range reads project, so they never touch the table;
+    -- the older narrow indexes only lured the planner away from the date range
+    CREATE INDEX IF NOT EXISTS idx_posts_covering ON posts(post_datetime, platform, campaign, caption_style, reach, likes, follows_gained, email_captures);
+    DROP INDEX IF EXISTS idx_posts_platform_date;
+    DROP INDEX IF EXISTS idx_posts_campaign;
+    DROP INDEX IF EXISTS idx_posts_caption;
+    -- one row per (post, keyword), kept in step with posts.keywords on every insert
+    CREATE TABLE IF NOT EXISTS post_keywords(
+      post_id INTEGER NOT NULL REFERENCES posts(id),
+      keyword TEXT NOT NULL,
+      PRIMARY KEY(post_id, keyword)
+    );
+    CREATE INDEX IF NOT EXISTS idx_post_keywords_keyword ON post_keywords(keyword);
+"""
+
+def split_keywords(text):
+    # ',' or ';' separated, trimmed, lowercase
+    return sorted({k.strip() for k in (text or "").lower().replace(";", ",").split(",") if k.strip()})
+
+def index_keywords(conn, after_id=0):
+    """Fill post_keywords for every post with id > after_id from its comma-joined keywords column."""
+    rows = conn.execute("SELECT id, keywords FROM posts WHERE id > ? AND keywords <> ''", (after_id,)).fetchall()
+    conn.executemany("INSERT OR IGNORE INTO post_keywords(post_id, keyword) VALUES (?,?)",
+                     [(pid, k) for pid, text in rows for k in split_keywords(text)])
+
+@st.cache_resource(show_spinner=False)
+def init_db():
+    # idempotent, but only needs to run once per process rather than on every rerun
+    conn = get_conn()
+    conn.executescript(SCHEMA_SQL)
     # Auto-migrate: add keywords column if missing
     if not _column_exists(conn, "keywords"):
         conn.execute("ALTER TABLE posts ADD COLUMN keywords TEXT;")
-    conn.commit(); conn.close()
+    # Backfill post_keywords for posts saved before it existed (or since the last indexed one)
+    with write_lock(), conn:
+        conn.execute("BEGIN IMMEDIATE")
+        index_keywords(conn, conn.execute("SELECT COALESCE(MAX(post_id),0) FROM post_keywords").fetchone()[0])
+
+POST_COLUMNS = ["platform","post_datetime","campaign","caption_style","reach","likes","follows_gained","email_captures","notes","keywords"]
+INSERT_SQL = f"INSERT INTO posts ({','.join(POST_COLUMNS)}) VALUES ({','.join(['?']*len(POST_COLUMNS))})"
+
+@st.cache_resource(show_spinner=False)
+def _insert_plan():
+    # the posts schema only changes in init_db(), so read it once per process instead of on every save;
+    # legacy NOT NULL cols like 'format' get a fixed placeholder appended to each row
+    init_db()
+    required = {c["name"]: "Unspecified" for c in _table_info(get_conn())
+                if c["name"] not in POST_COLUMNS and c["name"] not in ("id","created_at") and c["notnull"] == 1 and c["dflt"] is None}
+    if not required:
+        return INSERT_SQL, ()
+    cols = POST_COLUMNS + list(required)
+    return f"INSERT INTO posts ({','.join(cols)}) VALUES ({','.join(['?']*len(cols))})", tuple(required.values())
+
+def save_posts(rows):
+    """Insert posts (tuples in POST_COLUMNS order) and index their keywords, all in one transaction."""
+    conn = get_conn()
+    sql, fill = _insert_plan()
+    with write_lock(), conn:
+        conn.execute("BEGIN IMMEDIATE")
+        last_id = conn.execute("SELECT COALESCE(MAX(id),0) FROM posts").fetchone()[0]
+        # prepared once by sqlite3, bound per row
+        conn.executemany(sql, (tuple(r) + fill for r in rows))
+        index_keywords(conn, last_id)
+    # the mtime key would catch this too, but clearing makes the next page load exact
+    _fetch_posts.clear()
+
+@st.cache_data(show_spinner=False)
+def _load_taxo_cached(mtime_ns: int):
+    # mtime_ns is only the cache key: any save_taxonomies() write invalidates it
+    return json.loads(TAXO_PATH.read_text())
+
+def _load_legacy_yaml(path):
+    # PyYAML is only needed for this one-shot migration, so keep it off the import path
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:
+        from yaml import SafeLoader as Loader
+    import yaml
+    return yaml.load(path.read_text(), Loader=Loader)
 
 def load_taxonomies():
     ensure_dirs()
     if not TAXO_PATH.exists():
-        TAXO_PATH.write_text(yaml.safe_dump(DEFAULT_TAXO, sort_keys=True))
-    return yaml.safe_load(TAXO_PATH.read_text())
+        # the JSON file is per-install (gitignored), so it is seeded once from the tracked YAML,
+        # which on existing installs also carries any values older versions added to it
+        if LEGACY_TAXO_PATH.exists():
+            save_taxonomies(_load_legacy_yaml(LEGACY_TAXO_PATH) or DEFAULT_TAXO)
+        else:
+            save_taxonomies(DEFAULT_TAXO)
+    return _load_taxo_cached(TAXO_PATH.stat().st_mtime_ns)
 
 def save_taxonomies(data):
-    TAXO_PATH.write_text(yaml.safe_dump(data, sort_keys=True))
+    TAXO_PATH.write_text(json.dumps(data, sort_keys=True, indent=2, ensure_ascii=False))
+    # don't rely on mtime alone: coarse filesystem timestamps can hide a quick second write
+    _load_taxo_cached.clear()
 
 def quick_add(label, key, group, options):
     opts = options + ["➕ Add new…"]
     choice = st.selectbox(label, opts, key=f"sel_{key}")
+    pending = st.session_state.setdefault("_pending_taxo", {})
     if choice == "➕ Add new…":
         new_val = st.text_input(f"Add new {group}", key=f"add_{key}")
         if new_val:
             norm = new_val.strip().title()
-            taxo = load_taxonomies()
-            lst = list(taxo.get(group, []))
-            if norm not in lst:
-                lst.append(norm); taxo[group] = lst; save_taxonomies(taxo)
-            st.caption("Added ✔")
+            # persisted by save_pending_taxonomies() once the post is saved, not on every rerun
+            # an existing value must also drop anything stashed by an earlier, unsaved submit
+            if norm in options:
+                pending.pop(group, None)
+            else:
+                pending[group] = norm
+            st.caption("Will be added on save ✔")
             return norm
         else:
             st.stop()
+    pending.pop(group, None)
     return choice
 
+def save_pending_taxonomies():
+    pending = st.session_state.pop("_pending_taxo", {})
+    if not pending:
+        return
+    taxo = load_taxonomies()
+    changed = False
+    for group, norm in pending.items():
+        lst = list(taxo.get(group, []))
+        if norm not in lst:
+            lst.append(norm); taxo[group] = lst; changed = True
+    if changed:
+        save_taxonomies(taxo)
+
 # ---------- helpers ----------
-STOPWORDS = set("""
+STOPWORDS = frozenset("""
 a an and are as at be by for from has have i in is it its of on or that the this to was were will with you your youre you're me we our
 about after again all also am among around because before being between can cant could couldn did didn do does doesn doing don down during each
 few first get got had hadn he her here hers herself him himself his how however if into isn just least less let like likely lot lots many
@@ -102,44 +232,136 @@ HASH_RE = re.compile(r"#(\w{2,})")
 
 def suggest_keywords(text: str, top_n: int = 15):
     if not text: return []
-    words = [w.lower() for w in WORD_RE.findall(text) if w.lower() not in STOPWORDS]
+    # tokenize first, then lowercase each token, so word boundaries are exactly WORD_RE's
+    words = [w for w in map(str.lower, WORD_RE.findall(text)) if w not in STOPWORDS]
     hashtags = [h.lower() for h in HASH_RE.findall(text)]
-    terms = words + hashtags
-    if not terms: return []
-    s = pd.Series(terms).value_counts()
-    return s.head(top_n).index.tolist()
+    return [t for t, _ in Counter(words + hashtags).most_common(top_n)]
+
+# the caption box reruns the script on every edit; only recompute when the text actually changes
+@st.cache_data(show_spinner=False, max_entries=64)
+def _suggest_cached(text: str):
+    return suggest_keywords(text)
 
 def sdiv(a,b):
-    try:
-        a=float(a); b=float(b)
-        return (a/b) if b else 0.0
-    except Exception:
-        return 0.0
+    # only fed the scorecard totals, which METRIC_SUMS guarantees are numeric
+    b = float(b)
+    return float(a)/b if b else 0.0
+
+METRICS = ["reach","likes","follows_gained","email_captures"]
+RATES = (("like_rate","likes"), ("follow_rate","follows_gained"), ("capture_rate","email_captures"))
+
+def add_rates(g: pd.DataFrame) -> pd.DataFrame:
+    # vectorized per-group rates; groups with no reach keep the 0.0 fill (same as sdiv)
+    reach = g["reach"].to_numpy(dtype="float64")
+    for rate, col in RATES:
+        g[rate] = np.divide(g[col].to_numpy(dtype="float64"), reach, out=np.zeros_like(reach), where=reach != 0)
+    return g
+
+def top_rows(df: pd.DataFrame, col: str, n: int) -> pd.DataFrame:
+    # O(N) partition for the top n, then sort just those n rows (descending)
+    arr = df[col].to_numpy(dtype="float64")
+    k = min(n, arr.size)
+    if k == 0:
+        return df.iloc[:0]
+    idx = np.argpartition(-arr, k - 1)[:k]
+    return df.iloc[idx[np.argsort(-arr[idx], kind="stable")]]
 
 def monday_of(d: date) -> date: return d - timedelta(days=d.weekday())
 def last_full_week(now: datetime):
     lm = monday_of(now.date())
     return (lm - timedelta(days=7), lm - timedelta(days=1))
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def _recent_mondays(today: date, weeks: int = 12):
+    # oldest first, ending with this week's Monday
+    m = monday_of(today)
+    return tuple(m - timedelta(weeks=w) for w in range(weeks - 1, -1, -1))
+
+# ---------- queries ----------
+def unlabeled(col: str) -> str:
+    # NULL and '' both mean "no label": fold them in one pass inside SQLite
+    return f"COALESCE(NULLIF({col}, ''), 'Unlabeled')"
+
+METRIC_SUMS = ("COALESCE(SUM(reach),0) AS reach, COALESCE(SUM(likes),0) AS likes, "
+               "COALESCE(SUM(follows_gained),0) AS follows_gained, COALESCE(SUM(email_captures),0) AS email_captures")
+
+# Monday of the post's week (SQLite's 'weekday 0' moves forward to Sunday)
+WEEK_START = "date(post_datetime, 'weekday 0', '-6 days')"
+
+def _db_mtime_ns() -> int:
+    # WAL appends to the -wal file, so the main file's mtime alone would miss new posts
+    paths = (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal"))
+    return max((p.stat().st_mtime_ns for p in paths if p.exists()), default=0)
+
+INT_COLUMNS = set(METRICS)
+
+def _fetch_df(conn, q, params, parse_dates=()) -> pd.DataFrame:
+    # cheaper than pd.read_sql_query for our fixed schema: no dtype inference, metrics go straight to int64
+    cur = conn.execute(q, params)
+    names = [d[0] for d in cur.description]
+    rows = cur.fetchall()
+    if not rows:
+        return pd.DataFrame(columns=names)
+    # transpose rows to columns once (zip runs in C), then convert each column in bulk
+    data = {}
+    for name, col in zip(names, zip(*rows)):
+        if name in INT_COLUMNS:
+            # METRIC_SUMS coalesces, so never NULL; downcast picks the narrowest int dtype that still fits the sums
+            data[name] = pd.to_numeric(np.array(col, dtype="int64"), downcast="integer")
+        elif name in parse_dates:
+            data[name] = pd.to_datetime(list(col), cache=True)
+        else:
+            data[name] = list(col)
+    return pd.DataFrame(data, copy=False)
+
+# (filters key, column) for every multiselect filter the pages share
+FILTER_COLUMNS = (("platforms", "platform"), ("campaigns", "campaign"), ("caption_styles", "caption_style"))
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _where_sql(date_col: str, active: tuple) -> str:
+    # post_datetime is ISO-8601 text, so a plain half-open range sorts correctly and can use an index
+    sql = f"WHERE {date_col} >= ? AND {date_col} < ?"
+    # one JSON-array parameter per filter keeps the SQL text identical whatever the selection size,
+    # so sqlite3's statement cache can reuse the prepared statement
+    for col in active:
+        sql += f" AND {col} IN (SELECT value FROM json_each(?))"
+    return sql
+
+def build_where(filters: dict, date_col: str = "post_datetime"):
+    """Return (where_sql, params) for a filters dict with start/end dates and the FILTER_COLUMNS lists."""
+    active = [(key, col) for key, col in FILTER_COLUMNS if filters.get(key)]
+    params = [filters["start"].isoformat(), (filters["end"] + timedelta(days=1)).isoformat()]
+    # sorted so the same selection in any click order hits the same cache entry
+    params += [json.dumps(sorted(filters[key])) for key, _ in active]
+    return _where_sql(date_col, tuple(col for _, col in active)), tuple(params)
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _build_query(columns: str, where: str, group_by: str = "", source: str = "posts") -> str:
+    q = f"SELECT {columns} FROM {source} {where}"
+    if group_by: q += f" GROUP BY {group_by}"
+    return q
+
+# bounded: writes from outside this process change db_mtime without clearing, so old keys would pile up
+@st.cache_data(show_spinner=False, max_entries=64)
+def _fetch_posts(q: str, params: tuple, db_mtime: int, parse_dates: tuple = ()) -> pd.DataFrame:
+    # db_mtime is only the cache key: any write to the DB invalidates cached frames.
+    # main() runs init_db() before any page, so the DB always exists by now
+    return _fetch_df(get_read_conn(), q, params, parse_dates)
+
+def fetch_posts(columns, filters, group_by="", parse_dates=(), source="posts"):
+    where, params = build_where(filters)
+    return _fetch_posts(_build_query(columns, where, group_by, source), params, _db_mtime_ns(), tuple(parse_dates))
+
 # ---------- Scorecard ----------
 def scorecard(filters):
     st.subheader("Scorecard (Lean)")
-    conn = get_conn()
-    q = "SELECT platform, post_datetime, campaign, caption_style, reach, likes, follows_gained, email_captures FROM posts WHERE date(post_datetime) BETWEEN ? AND ?"
-    params = [filters["start"].isoformat(), filters["end"].isoformat()]
-    if filters["platforms"]:
-        q += " AND platform IN (%s)" % ",".join(["?"]*len(filters["platforms"])); params += filters["platforms"]
-    if filters["campaigns"]:
-        q += " AND campaign IN (%s)" % ",".join(["?"]*len(filters["campaigns"])); params += filters["campaigns"]
-    if filters["caption_styles"]:
-        q += " AND caption_style IN (%s)" % ",".join(["?"]*len(filters["caption_styles"])); params += filters["caption_styles"]
-    df = pd.read_sql_query(q, conn, params=params, parse_dates=["post_datetime"]) if DB_PATH.exists() else pd.DataFrame()
-    conn.close()
+    # SQLite returns one row per week; the KPI tiles are just the sum of those few rows
+    week = fetch_posts(f"{WEEK_START} AS week, {METRIC_SUMS}", filters, group_by="1", parse_dates=["week"])
 
-    if df.empty:
+    if week.empty:
         st.info("No data in this window. Add posts in Data Entry."); return
 
-    totals = df[["reach","likes","follows_gained","email_captures"]].fillna(0).sum()
+    totals = week[METRICS].sum()
     like_rate   = sdiv(totals["likes"], totals["reach"])
     follow_rate = sdiv(totals["follows_gained"], totals["reach"])
     capture_rate= sdiv(totals["email_captures"], totals["reach"])
@@ -150,8 +372,9 @@ def scorecard(filters):
     c3.metric("Follows", int(totals["follows_gained"]), f"{follow_rate*100:.1f}% rate")
     c4.metric("Email Captures", int(totals["email_captures"]), f"{capture_rate*100:.1f}% rate")
 
-    week = df.set_index("post_datetime").resample("W-MON").sum(numeric_only=True).reset_index().rename(columns={"post_datetime":"week"})
-    st.line_chart(week.set_index("week")[["reach","likes","follows_gained","email_captures"]])
+    # weeks without posts have no row; chart them as zeros rather than bridging the gap
+    mondays = pd.date_range(week["week"].min(), week["week"].max(), freq="7D", name="week")
+    st.line_chart(week.set_index("week")[METRICS].reindex(mondays, fill_value=0))
 
 # ---------- Insights (Caption / Platform / Campaign / Keyword) ----------
 DIMENSIONS = {
@@ -161,21 +384,6 @@ DIMENSIONS = {
     "Keyword": ("keyword", "keyword"),
 }
 
-def _explode_keywords(df: pd.DataFrame) -> pd.DataFrame:
-    if "keywords" not in df.columns:
-        return pd.DataFrame(columns=["keyword","reach","likes","follows_gained","email_captures"])
-    temp = df[["keywords","reach","likes","follows_gained","email_captures"]].copy()
-    temp["keywords"] = temp["keywords"].fillna("")
-    temp["keyword"] = (
-        temp["keywords"].astype(str).str.replace(";", ",").str.split(",")
-        .apply(lambda lst: [k.strip().lower() for k in lst if k and k.strip()])
-    )
-    temp = temp.explode("keyword")
-    temp = temp[temp["keyword"].notna() & temp["keyword"].ne("")]
-    if temp.empty:
-        return pd.DataFrame(columns=["keyword","reach","likes","follows_gained","email_captures"])
-    return temp[["keyword","reach","likes","follows_gained","email_captures"]]
-
 def insights(filters):
     st.subheader("Insights")
 
@@ -184,37 +392,26 @@ def insights(filters):
         st.session_state["insights_rank_by"] = "success_score (composite)"
 
     dim = st.selectbox("Dimension", list(DIMENSIONS.keys()), index=0)
+    col, label = DIMENSIONS[dim]
+    source = "posts"
+    if col == "keyword":
+        select, group = f"k.keyword AS {label}, {METRIC_SUMS}", "1"
+        source = "posts JOIN post_keywords k ON k.post_id = posts.id"
+    else:
+        # col is interpolated into SQL, so it must come from the whitelist
+        if col not in {c for c, _ in DIMENSIONS.values()}:
+            raise ValueError(f"unknown dimension column: {col}")
+        select = f"{unlabeled(col)} AS {label}, {METRIC_SUMS}"
+        group = "1"
 
-    conn = get_conn()
-    q = "SELECT platform, campaign, caption_style, keywords, reach, likes, follows_gained, email_captures FROM posts WHERE date(post_datetime) BETWEEN ? AND ?"
-    params = [filters["start"].isoformat(), filters["end"].isoformat()]
-    if filters["platforms"]:
-        q += " AND platform IN (%s)" % ",".join(["?"]*len(filters["platforms"])); params += filters["platforms"]
-    if filters["campaigns"]:
-        q += " AND campaign IN (%s)" % ",".join(["?"]*len(filters["campaigns"])); params += filters["campaigns"]
-    if filters["caption_styles"]:
-        q += " AND caption_style IN (%s)" % ",".join(["?"]*len(filters["caption_styles"])); params += filters["caption_styles"]
-    df = pd.read_sql_query(q, conn, params=params) if DB_PATH.exists() else pd.DataFrame()
-    conn.close()
+    df = fetch_posts(select, filters, group_by=group, source=source)
 
     if df.empty:
-        st.info("No posts for this window/filters yet."); return
-
-    col, label = DIMENSIONS[dim]
-    if col == "keyword":
-        base = _explode_keywords(df)
-        if base.empty:
+        if col == "keyword":
             st.info("No keywords found yet. Add captions/keywords on Data Entry."); return
-        g = base.groupby("keyword")[["reach","likes","follows_gained","email_captures"]].sum().reset_index().rename(columns={"keyword": label})
-    else:
-        key_col = {"caption_style":"style","platform":"platform","campaign":"campaign"}[col]
-        df[col] = df[col].fillna("Unlabeled").replace("", "Unlabeled")
-        g = df.groupby(col, dropna=False)[["reach","likes","follows_gained","email_captures"]].sum().reset_index().rename(columns={col: key_col})
-        label = key_col
+        st.info("No posts for this window/filters yet."); return
 
-    g["like_rate"]    = g.apply(lambda r: sdiv(r["likes"], r["reach"]), axis=1)
-    g["follow_rate"]  = g.apply(lambda r: sdiv(r["follows_gained"], r["reach"]), axis=1)
-    g["capture_rate"] = g.apply(lambda r: sdiv(r["email_captures"], r["reach"]), axis=1)
+    g = add_rates(df)
 
     c1,c2,c3 = st.columns(3)
     with c1:
@@ -230,13 +427,17 @@ def insights(filters):
         with w2: wc = st.slider("Weight: capture_rate", 0.0, 1.0, 0.3, 0.05, key="wc")
         with w3: wl = st.slider("Weight: like_rate",   0.0, 1.0, 0.1, 0.05, key="wl")
         total = max(wf+wc+wl, 1e-9); wf, wc, wl = wf/total, wc/total, wl/total
-        g["success_score (composite)"] = (wf*g["follow_rate"] + wc*g["capture_rate"] + wl*g["like_rate"])
+        # one output buffer instead of three scaled temporaries plus two sums
+        score = np.multiply(g["follow_rate"].to_numpy(), wf)
+        score += g["capture_rate"].to_numpy() * wc
+        score += g["like_rate"].to_numpy() * wl
+        g["success_score (composite)"] = score
 
     g_f = g[g["reach"] >= min_reach].copy()
     if g_f.empty:
         st.warning("All groups were filtered out by the min reach threshold."); return
 
-    g_sorted = g_f.sort_values(st.session_state["insights_rank_by"], ascending=False).head(top_n)
+    g_sorted = top_rows(g_f, st.session_state["insights_rank_by"], top_n)
     st.dataframe(g_sorted, use_container_width=True)
     try: st.bar_chart(g_sorted.set_index(label)[st.session_state["insights_rank_by"]])
     except Exception: pass
@@ -250,7 +451,7 @@ def weekly_review():
     today = datetime.now()
     default_start, _ = last_full_week(today)
 
-    mondays = sorted({monday_of((today - timedelta(weeks=w)).date()) for w in range(12)})
+    mondays = _recent_mondays(today.date())
     start = st.selectbox("Week starting (Monday)", mondays, index=mondays.index(default_start))
     end = start + timedelta(days=6)
     st.caption(f"Window: {start} → {end}")
@@ -270,30 +471,23 @@ def weekly_review():
     with col3:
         caption_styles = st.multiselect("Filter: Caption Style", taxo.get("caption_style", []), default=[], key="wr_caption_styles")
 
-    conn = get_conn()
-    q = "SELECT platform, post_datetime, campaign, caption_style, reach, likes, follows_gained, email_captures FROM posts WHERE date(post_datetime) BETWEEN ? AND ?"
-    params = [start.isoformat(), end.isoformat()]
-    if platforms: q += " AND platform IN (%s)" % ",".join(["?"]*len(platforms)); params += platforms
-    if campaigns: q += " AND campaign IN (%s)" % ",".join(["?"]*len(campaigns)); params += campaigns
-    if caption_styles: q += " AND caption_style IN (%s)" % ",".join(["?"]*len(caption_styles)); params += caption_styles
-    df = pd.read_sql_query(q, conn, params=params) if DB_PATH.exists() else pd.DataFrame()
-    conn.close()
-
-    if df.empty:
-        st.info("No posts in this week (with current filters)."); return
-
     gcol1,gcol2 = st.columns(2)
     with gcol1:
         group_by = st.selectbox("Group by", list(GROUPS.keys()), index=0, key="wr_groupby")
         gcol = GROUPS[group_by]
     with gcol2:
         metric = st.selectbox("Sort by", ["reach","likes","follows_gained","email_captures","like_rate","follow_rate","capture_rate"], index=0, key="wr_metric")
+    # gcol is interpolated into SQL, so it must come from the whitelist
+    if gcol not in GROUPS.values():
+        raise ValueError(f"unknown group column: {gcol}")
+
+    wr_filters = {"start": start, "end": end, "platforms": platforms, "campaigns": campaigns, "caption_styles": caption_styles}
+    df = fetch_posts(f"{unlabeled(gcol)} AS \"group\", {METRIC_SUMS}", wr_filters, group_by="1")
 
-    agg_cols = ["reach","likes","follows_gained","email_captures"]
-    g = df.groupby(gcol, dropna=False)[agg_cols].sum().reset_index().rename(columns={gcol:"group"})
-    g["like_rate"]    = g.apply(lambda r: sdiv(r["likes"], r["reach"]), axis=1)
-    g["follow_rate"]  = g.apply(lambda r: sdiv(r["follows_gained"], r["reach"]), axis=1)
-    g["capture_rate"] = g.apply(lambda r: sdiv(r["email_captures"], r["reach"]), axis=1)
+    if df.empty:
+        st.info("No posts in this week (with current filters)."); return
+
+    g = add_rates(df)
     g = g.sort_values(metric, ascending=False)
 
     st.dataframe(g, use_container_width=True)
@@ -303,6 +497,45 @@ def weekly_review():
                        file_name=f"weekly_{group_by.lower()}_{start}.csv", mime="text/csv")
 
 # ---------- Data Entry ----------
+def import_posts_csv(file) -> int:
+    """Bulk-insert posts from a CSV upload in one transaction; returns the row count."""
+    df = pd.read_csv(file, dtype=str, keep_default_na=False)
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = [c for c in ("platform","post_datetime") if c not in df.columns]
+    if missing:
+        raise ValueError(f"CSV is missing required column(s): {', '.join(missing)}")
+    if df.empty:
+        return 0
+
+    df["platform"] = df["platform"].str.strip().str.lower()
+    unknown = sorted(set(df["platform"]) - set(PLATFORMS))
+    if unknown:
+        raise ValueError(f"Unknown platform(s): {', '.join(unknown)}")
+    ts = pd.to_datetime(df["post_datetime"], errors="coerce", format="mixed")
+    if ts.isna().any():
+        raise ValueError(f"{int(ts.isna().sum())} row(s) have an unreadable post_datetime")
+    df["post_datetime"] = ts.dt.strftime("%Y-%m-%dT%H:%M")
+    for c in METRICS:
+        if c not in df.columns:
+            df[c] = 0; continue
+        raw = df[c].str.strip()
+        num = pd.to_numeric(raw.mask(raw == "", "0"), errors="coerce")
+        # same rules as the form's number inputs, and nothing that would wrap when cast to int64
+        bad = num.isna() | (num < 0) | (num % 1 != 0) | (num >= 2**63)
+        if bad.any():
+            raise ValueError(f"{int(bad.sum())} row(s) have an invalid {c} (expected a whole number ≥ 0)")
+        df[c] = num.astype("int64")
+    # like the form, a post needs at least one non-zero metric
+    empty = ~df[METRICS].any(axis=1)
+    if empty.any():
+        raise ValueError(f"{int(empty.sum())} row(s) have no metrics (enter at least one of {', '.join(METRICS)})")
+    for c in ("campaign","caption_style","notes","keywords"):
+        if c not in df.columns: df[c] = ""
+
+    # tolist() yields plain Python scalars, which sqlite3 can bind; blank text becomes NULL
+    values = [[v if v != "" else None for v in df[c].tolist()] for c in POST_COLUMNS]
+    save_posts(zip(*values))
+    return len(df)
 
 def data_entry():
     st.subheader("Data Entry (Lean + Auto-Keywords)")
@@ -325,18 +558,35 @@ def data_entry():
     # --- Caption & Keywords (live suggestions, outside the form) ---
     with st.expander("Caption & Keywords", expanded=True):
         caption = st.text_area("Caption (optional — used to suggest keywords)", height=120, key="caption_text_live")
-        suggestions = suggest_keywords(caption)
+        suggestions = _suggest_cached(caption)
         colA, colB = st.columns([2,1])
         with colA:
             selected = st.multiselect("Suggested keywords", options=suggestions,
                                       default=(suggestions[:5] if suggestions else []), key="kw_selected")
         with colB:
             extra = st.text_input("Add keywords (comma-separated)", key="kw_extra")
-        extra_list = [k.strip().lower() for k in (extra or "").split(",") if k.strip()]
-        keywords = sorted(set([*(selected or []), *extra_list]))
+        extra_iter = (k.strip().lower() for k in extra.split(",")) if extra else ()
+        keywords = sorted({k for k in (*(selected or []), *extra_iter) if k})
         st.caption(f"Will save keywords: {', '.join(keywords) or '(none)'}")
     keywords_str = ", ".join(keywords)
 
+    # --- Bulk import (one transaction for the whole file) ---
+    with st.expander("Bulk import (CSV)"):
+        st.caption(f"Columns: {', '.join(POST_COLUMNS)} — platform and post_datetime are required, plus at least one non-zero metric per row.")
+        if "csv_imported" in st.session_state:
+            st.success(f"Imported {st.session_state.pop('csv_imported')} posts ✔")
+        upload = st.file_uploader("CSV file", type=["csv"], key=f"csv_upload_{st.session_state.get('csv_upload_gen', 0)}")
+        if upload is not None and st.button("Import posts"):
+            try:
+                n = import_posts_csv(upload)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                # a fresh uploader key drops the file, so a second click can't import the same rows again
+                st.session_state["csv_upload_gen"] = st.session_state.get("csv_upload_gen", 0) + 1
+                st.session_state["csv_imported"] = n
+                st.rerun()
+
     # --- Form (atomic save) ---
     with st.form("post_form", clear_on_submit=True):
         col1,col2,col3 = st.columns(3)
@@ -364,9 +614,6 @@ def data_entry():
             if not (reach or likes or follows or captures):
                 st.error("Enter at least one metric (Reach, Likes, Follows, or Email Captures).")
             else:
-                conn = get_conn()
-                # Build row (and satisfy any legacy NOT NULL cols like 'format')
-                info = conn.execute("PRAGMA table_info(posts)").fetchall()
                 base = {
                     "platform": st.session_state.get("platform_select", platform),
                     "post_datetime": datetime.combine(d,t).isoformat(timespec="minutes"),
@@ -379,15 +626,8 @@ def data_entry():
                     "notes": notes,
                     "keywords": keywords_str,
                 }
-                for cid, name, *_ , notnull, dflt in info:
-                    if name in ("id","created_at"): continue
-                    if name not in base and notnull==1 and dflt is None:
-                        base[name] = "Unspecified"
-
-                cols = list(base.keys())
-                conn.execute(f"INSERT INTO posts ({','.join(cols)}) VALUES ({','.join(['?']*len(cols))})",
-                             tuple(base[c] for c in cols))
-                conn.commit(); conn.close()
+                save_posts([tuple(base[c] for c in POST_COLUMNS)])
+                save_pending_taxonomies()
 
                 # After save: clear kw widgets next run; optionally carry over selections
                 st.session_state["reset_kw"] = True